@@ -1,7 +1,17 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import requests
+import numpy as np
+import plotly.graph_objects as go
+import contextlib
+import logging
+import os
+import pathlib
+import sys
+import time
+import uuid
+from typing import List, Optional, Tuple
+import msgspec
+import requests_cache
 
 # Page Config
 st.set_page_config(
@@ -10,20 +20,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Colours live in .streamlit/config.toml [theme]; only what the theme
+# can't express is injected here, since this block is resent every rerun
 st.markdown("""
     <style>
-        .stApp {
-            background-color: #0a192f;
-            color: #e6f1ff;
-        }
-        
         [data-testid="stSidebar"] {
-            background-color: rgba(17, 34, 64, 0.8);
             border-right: 1px solid rgba(100, 255, 218, 0.1);
         }
         
         h1, h2, h3, h4, h5, h6, p, label, .stMarkdown {
-            color: #e6f1ff !important;
             font-family: 'Inter', sans-serif;
         }
         
@@ -34,10 +39,6 @@ st.markdown("""
             color: #8892b0 !important;
         }
         
-        .stSlider [data-baseweb="slider"] {
-            color: #64ffda;
-        }
-        
         a {
             color: #64ffda !important;
             text-decoration: none;
@@ -45,19 +46,90 @@ st.markdown("""
         a:hover {
             text-decoration: underline;
         }
-        
-        .css-1r6slb0 {
-            background: rgba(17, 34, 64, 0.6);
-            border-radius: 12px;
-            border: 1px solid rgba(100, 255, 218, 0.1);
-            padding: 1rem;
-        }
     </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def fetch_co2_data():
-    """Fetch CO2 emissions data from World Bank API (Indicator: EN.ATM.CO2E.PC)"""
+# Streamlit only configures its own loggers, so give ours a handler (once;
+# the script re-runs on every interaction) or INFO records are dropped
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# One day; the indicator is only revised a few times a year
+CACHE_TTL = 86400
+
+@st.cache_resource
+def get_session():
+    """Shared HTTP session backed by an on-disk cache, built once per process
+
+    The sqlite cache lets cold starts and extra workers skip the download;
+    requests already asks for gzip, which the World Bank API honours.
+    """
+    return requests_cache.CachedSession(
+        "wb_cache.sqlite",
+        expire_after=CACHE_TTL,
+        cache_control=True
+    )
+
+# World Bank regional/income aggregates. They have no shape on the map,
+# so shipping them to the browser is wasted payload (and they skew the
+# country count and average)
+WB_AGGREGATES = frozenset({
+    "AFE", "AFW", "ARB", "CEB", "CSS", "EAP", "EAR", "EAS", "ECA", "ECS",
+    "EMU", "EUU", "FCS", "HIC", "HPC", "IBD", "IBT", "IDA", "IDB", "IDX",
+    "INX", "LAC", "LCN", "LDC", "LIC", "LMC", "LMY", "LTE", "MEA", "MIC",
+    "MNA", "NAC", "OED", "OSS", "PRE", "PSS", "PST", "SAS", "SSA", "SSF",
+    "SST", "TEA", "TEC", "TLA", "TMN", "TSA", "TSS", "UMC", "WLD"
+})
+
+class CountryRef(msgspec.Struct):
+    value: str
+
+class Record(msgspec.Struct):
+    """The fields we read from one World Bank observation"""
+    countryiso3code: str
+    country: CountryRef
+    date: str
+    value: Optional[float] = None
+
+# Cleaned frame shared by every worker; parquet keeps the compact dtypes
+DATA_PATH = pathlib.Path("co2.parquet")
+
+def read_saved_data():
+    """Read the parquet copy at DATA_PATH, or None if it is missing or unreadable"""
+    try:
+        return pd.read_parquet(DATA_PATH)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("Ignoring unreadable %s", DATA_PATH, exc_info=True)
+        return None
+
+def save_data(df):
+    """Write df to DATA_PATH atomically so other workers never read a partial file
+
+    A failed write only logs; the caller still serves the downloaded frame.
+    """
+    # A unique name rather than mkstemp, which would create the file 0600;
+    # letting to_parquet create it keeps the umask-derived mode other
+    # workers need to read it
+    tmp_path = DATA_PATH.with_name(f"{DATA_PATH.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        df.to_parquet(tmp_path, compression='zstd', engine='pyarrow')
+        os.replace(tmp_path, DATA_PATH)
+    except OSError:
+        logger.warning("Could not write %s", DATA_PATH, exc_info=True)
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+def download_co2_data():
+    """Download and clean CO2 emissions data from World Bank API (Indicator: EN.ATM.CO2E.PC)
+
+    The cleaned frame is written to DATA_PATH for the next cold start.
+    """
     url = "http://api.worldbank.org/v2/country/all/indicator/EN.ATM.CO2E.PC"
     
     params = {
@@ -66,35 +138,175 @@ def fetch_co2_data():
         "source": 75
     }
     
-    try:
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if len(data) < 2:
-            return pd.DataFrame()
-            
-        records = data[1]
-        if not records:
-            return pd.DataFrame()
-
-        df = pd.DataFrame(records)
-        
-        if 'country' not in df.columns or 'value' not in df.columns or 'countryiso3code' not in df.columns:
-            return pd.DataFrame()
+    response = get_session().get(url, params=params, timeout=10)
+    if not response.from_cache:
+        logger.info("World Bank cache miss, fetched %s", response.url)
+    
+    # Expired cache entries are revalidated with If-None-Match /
+    # If-Modified-Since. On a 304 the parsed copy on disk is still current,
+    # so mark it fresh and skip the parse
+    if getattr(response, 'revalidated', False):
+        df = read_saved_data()
+        if df is not None:
+            DATA_PATH.touch()
+            return df
+    
+    # The payload is [metadata, [records...]]; msgspec decodes the records
+    # straight into typed structs and skips every field we don't declare.
+    # Codes and names repeat every year, so they are interned: one str
+    # object per country, which pd.Categorical then factorizes by identity
+    _, items = msgspec.json.decode(response.content, type=Tuple[dict, List[Record]])
+    records = [
+        (sys.intern(rec.countryiso3code), sys.intern(rec.country.value), int(rec.date), rec.value)
+        for rec in items
+        if rec.value is not None
+        and rec.countryiso3code
+        and rec.countryiso3code not in WB_AGGREGATES
+    ]
+    
+    if not records:
+        raise ValueError("World Bank API returned no CO2 records")
+    
+    # Build each column as its own contiguous 1-D array in its final dtype,
+    # instead of going through a row-major object block from from_records.
+    # Years fit in int16 and per-capita values don't need float64; the
+    # few hundred repeated country codes/names become integer codes
+    economy, country, year, co2 = zip(*records)
+    df = pd.DataFrame({
+        'economy': pd.Categorical(economy),
+        'Country': pd.Categorical(country),
+        'year': np.array(year, dtype=np.int16),
+        'co2_per_capita': np.array(co2, dtype=np.float32)
+    })
+    
+    save_data(df)
+    return df
 
-        df['Country'] = df['country'].apply(lambda x: x['value'] if isinstance(x, dict) else '')
-        df['economy'] = df['countryiso3code']
-        
-        df = df.rename(columns={'value': 'co2_per_capita', 'date': 'year'})
-        df['year'] = df['year'].astype(int)
-        
-        df = df.dropna(subset=['co2_per_capita'])
-        df = df[df['economy'].notna() & (df['economy'] != '')]
-        
-        return df[['economy', 'Country', 'year', 'co2_per_capita']]
-        
-    except Exception:
-        return pd.DataFrame()
+@st.cache_data(ttl=CACHE_TTL)
+def fetch_co2_data():
+    """Load CO2 emissions data, from the local parquet copy while it is fresh
+
+    Returns the long-form DataFrame, sorted by year then emissions
+    (highest first), a dict of ``{'count', 'mean'}`` stats per year, and a
+    content hash that changes whenever the data does.
+    Raises if there is neither a download nor a saved copy, so the failure
+    isn't cached.
+    """
+    df = None
+    if DATA_PATH.exists() and time.time() - DATA_PATH.stat().st_mtime < CACHE_TTL:
+        df = read_saved_data()
+    
+    if df is None:
+        try:
+            df = download_co2_data()
+        except Exception:
+            # A stale copy beats an error page while the API is down
+            df = read_saved_data()
+            if df is None:
+                raise
+            logger.warning("World Bank download failed, serving stale %s", DATA_PATH, exc_info=True)
+    
+    # Sort once: by year, highest emitters first within each year. A year
+    # is then a contiguous slice (found with searchsorted) whose head is
+    # its top 10, so no per-year copies need to be kept
+    df = df.sort_values(['year', 'co2_per_capita'], ascending=[True, False], ignore_index=True)
+    
+    # Sidebar metrics per year in one pass over the sorted arrays
+    years = df['year'].to_numpy()
+    values = df['co2_per_capita'].to_numpy()
+    starts = np.flatnonzero(np.diff(years, prepend=-1))
+    counts = np.diff(starts, append=len(years))
+    means = np.add.reduceat(values, starts, dtype=np.float64) / counts
+    stats = {
+        int(years[start]): {'count': int(count), 'mean': float(mean)}
+        for start, count, mean in zip(starts, counts, means)
+    }
+    
+    # Keys the figure caches, so charts are rebuilt when the data changes
+    data_version = int(pd.util.hash_pandas_object(df, index=False).sum())
+    
+    return df, stats, data_version
+
+@st.cache_resource(ttl=CACHE_TTL)
+def build_map(year, data_version, _year_df):
+    """Build the choropleth for one year
+
+    Cached on ``year`` and ``data_version`` (the frame itself is not
+    hashed), so reruns reuse the figure until the data changes.
+    """
+    # graph_objects directly: Plotly Express's frame processing was most
+    # of the build time
+    fig_map = go.Figure(go.Choropleth(
+        locations=_year_df['economy'].to_numpy(),
+        locationmode="ISO-3",
+        z=_year_df['co2_per_capita'].to_numpy(),
+        hovertext=_year_df['Country'].to_numpy(),
+        hovertemplate="<b>%{hovertext}</b><br><br>economy=%{location}<br>CO₂ (t/capita)=%{z}<extra></extra>",
+        colorscale="Portland",
+        zmin=0,
+        zmax=20,
+        colorbar=dict(
+            title="t/capita",
+            thickness=15,
+            len=0.6,
+            tickfont=dict(color="#8892b0")
+        )
+    ))
+    
+    fig_map.update_layout(
+        template="plotly_dark",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin={"r":0,"t":0,"l":0,"b":0},
+        geo=dict(
+            bgcolor="rgba(0,0,0,0)",
+            showlakes=False,
+            showframe=False,
+            projection_type="natural earth",
+            coastlinecolor="rgba(100, 255, 218, 0.1)",
+            landcolor="rgba(100, 255, 218, 0.02)"
+        ),
+        font=dict(family="Inter, sans-serif", color="#e6f1ff")
+    )
+    return fig_map
+
+@st.cache_resource(ttl=CACHE_TTL)
+def build_bar(year, data_version, _top_10):
+    """Build the top emitters bar chart for one year, cached like build_map"""
+    values = _top_10['co2_per_capita'].to_numpy()
+    fig_bar = go.Figure(go.Bar(
+        x=_top_10['Country'].to_numpy(),
+        y=values,
+        orientation='v',
+        marker=dict(color=values, colorscale="Portland", cmin=0, cmax=20),
+        # Label from y rather than a copy of the values in `text`
+        texttemplate='%{y:.1f}',
+        textposition='outside',
+        textfont=dict(color="#8892b0", size=11),
+        hovertemplate="Country=%{x}<br>co2_per_capita=%{y}<extra></extra>"
+    ))
+    
+    fig_bar.update_layout(
+        template="plotly_dark",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        margin={"r":0,"t":20,"l":0,"b":0},
+        yaxis=dict(
+            showgrid=True, 
+            gridcolor="rgba(100, 255, 218, 0.05)", 
+            showticklabels=True,
+            title=None,
+            range=[0, values.max(initial=0) * 1.15]
+        ),
+        xaxis=dict(
+            categoryorder='total descending', 
+            tickfont=dict(color="#e6f1ff", size=11),
+            title=None
+        ),
+        font=dict(family="Inter, sans-serif", color="#e6f1ff"),
+        showlegend=False
+    )
+    return fig_bar
 
 # Header
 st.title("Global Carbon Emissions ")
@@ -102,7 +314,11 @@ st.markdown("Visualization of **CO₂ emissions per capita** (metric tons). Data
 
 # Main App Logic
 with st.spinner("Loading data..."):
-    df = fetch_co2_data()
+    try:
+        df, stats, data_version = fetch_co2_data()
+    except Exception:
+        logger.exception("Unable to load CO2 data")
+        df, stats, data_version = pd.DataFrame(), {}, None
     
     if df.empty:
         st.error("Unable to load data. Please try again later.")
@@ -115,98 +331,31 @@ with st.spinner("Loading data..."):
         
         selected_year = st.sidebar.slider("Select Year", min_year, max_year, max_year)
         
-        year_df = df[df['year'] == selected_year]
+        # Rows are sorted by year, so the year is a slice, not a mask
+        lo, hi = np.searchsorted(df['year'].to_numpy(), [selected_year, selected_year + 1])
+        year_df = df.iloc[lo:hi]
         
         # Metrics
+        year_stats = stats.get(selected_year)
         col1, col2 = st.sidebar.columns(2)
-        col1.metric("Countries", len(year_df))
-        col2.metric("Global Avg", f"{year_df['co2_per_capita'].mean():.2f} t" if not year_df.empty else "N/A")
+        col1.metric("Countries", year_stats['count'] if year_stats else 0)
+        col2.metric("Global Avg", f"{year_stats['mean']:.2f} t" if year_stats else "N/A")
         
         # Layout: Map (Top) and Top 10 (Bottom)
         
         # Global Map
         st.subheader(f"Global Map ({selected_year})")
         
-        fig_map = px.choropleth(
-            year_df,
-            locations="economy",
-            locationmode="ISO-3",
-            color="co2_per_capita",
-            hover_name="Country",
-            color_continuous_scale="Portland",
-            range_color=[0, 20],
-            labels={"co2_per_capita": "CO₂ (t/capita)"}
-        )
-        
-        fig_map.update_layout(
-            template="plotly_dark",
-            plot_bgcolor="rgba(0,0,0,0)",
-            paper_bgcolor="rgba(0,0,0,0)",
-            margin={"r":0,"t":0,"l":0,"b":0},
-            geo=dict(
-                bgcolor="rgba(0,0,0,0)",
-                showlakes=False,
-                showframe=False,
-                projection_type="natural earth",
-                coastlinecolor="rgba(100, 255, 218, 0.1)",
-                landcolor="rgba(100, 255, 218, 0.02)"
-            ),
-            font=dict(family="Inter, sans-serif", color="#e6f1ff"),
-            coloraxis_colorbar=dict(
-                title="t/capita",
-                thickness=15,
-                len=0.6,
-                tickfont=dict(color="#8892b0")
-            )
-        )
-        st.plotly_chart(fig_map, use_container_width=True)
+        st.plotly_chart(build_map(selected_year, data_version, year_df), use_container_width=True)
         
         st.markdown("---")
         
         # Top Emitters Bar Chart
         st.subheader("Top Emitters")
         
-        top_10 = year_df.sort_values('co2_per_capita', ascending=False).head(10)
-        
-        fig_bar = px.bar(
-            top_10,
-            x="Country",
-            y="co2_per_capita",
-            orientation='v',
-            color="co2_per_capita",
-            color_continuous_scale="Portland",
-            range_color=[0, 20],
-            text="co2_per_capita"
-        )
+        top_10 = year_df.head(10)
         
-        fig_bar.update_traces(
-            texttemplate='%{text:.1f}',
-            textposition='outside',
-            textfont=dict(color="#8892b0", size=11)
-        )
-        
-        fig_bar.update_layout(
-            template="plotly_dark",
-            plot_bgcolor="rgba(0,0,0,0)",
-            paper_bgcolor="rgba(0,0,0,0)",
-            margin={"r":0,"t":20,"l":0,"b":0},
-            yaxis=dict(
-                showgrid=True, 
-                gridcolor="rgba(100, 255, 218, 0.05)", 
-                showticklabels=True,
-                title=None,
-                range=[0, top_10['co2_per_capita'].max() * 1.15]
-            ),
-            xaxis=dict(
-                categoryorder='total descending', 
-                tickfont=dict(color="#e6f1ff", size=11),
-                title=None
-            ),
-            font=dict(family="Inter, sans-serif", color="#e6f1ff"),
-            showlegend=False,
-            coloraxis_showscale=False
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        st.plotly_chart(build_bar(selected_year, data_version, top_10), use_container_width=True)
 
         st.markdown("---")
         st.markdown(